@@ -2,8 +2,10 @@
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Optional, Any
+import heapq
 import json
-from collections import defaultdict
+from collections import Counter, defaultdict
+from operator import itemgetter
 
 from core.firebase_config import FirebaseDB
 
@@ -52,12 +54,13 @@ class DataProcessor:
             'conversion_rate': 0
         }
         
-        # Count by status
+        # Count by status in a single pass
+        status_counter = Counter(c.get('status') for c in customers)
         for status in ['Lead', 'Prospect', 'Active', 'Inactive']:
-            customer_metrics['by_status'][status] = len([c for c in customers if c.get('status') == status])
+            customer_metrics['by_status'][status] = status_counter[status]
         
         # Calculate conversion rate
-        active_customers = len([c for c in customers if c.get('status') == 'Active'])
+        active_customers = status_counter['Active']
         if customer_metrics['total'] > 0:
             customer_metrics['conversion_rate'] = round((active_customers / customer_metrics['total']) * 100, 2)
         
@@ -308,23 +311,26 @@ class DataProcessor:
                 'by_stage': {},
                 'by_status': {},
                 'by_month': DataProcessor._group_by_month_firebase(deals, 'created_date'),
-                'largest_deals': sorted(deals, key=lambda x: x.get('value', 0), reverse=True)[:10]
+                'largest_deals': heapq.nlargest(10, deals, key=lambda x: x.get('value', 0))
             },
             'performance': DataProcessor.get_dashboard_metrics(),
             'trends': DataProcessor.get_sales_trends(),
             'pipeline': DataProcessor.get_pipeline_analytics()
         }
         
-        # Calculate by_status for customers
+        # Calculate by_status for customers (one pass per counter)
+        customer_statuses = Counter(c.get('status') for c in customers)
         for status in ['Lead', 'Prospect', 'Active', 'Inactive']:
-            report['customers']['by_status'][status] = len([c for c in customers if c.get('status') == status])
+            report['customers']['by_status'][status] = customer_statuses[status]
         
         # Calculate by_stage and by_status for deals
+        deal_stages = Counter(d.get('stage') for d in deals)
         for stage in ['Lead', 'Qualified', 'Proposal', 'Negotiation', 'Won', 'Lost']:
-            report['deals']['by_stage'][stage] = len([d for d in deals if d.get('stage') == stage])
+            report['deals']['by_stage'][stage] = deal_stages[stage]
         
+        deal_statuses = Counter(d.get('status') for d in deals)
         for status in ['Active', 'Won', 'Lost', 'On Hold']:
-            report['deals']['by_status'][status] = len([d for d in deals if d.get('status') == status])
+            report['deals']['by_status'][status] = deal_statuses[status]
         
         return report
     
@@ -372,7 +378,7 @@ class DataProcessor:
             if customer_name in customer_values:
                 customer_values[customer_name]['customer_data'] = customer
         
-        # Sort and return top 10
+        # Return the top 10 by value
         top_customers = []
         for customer_name, data in customer_values.items():
             customer_info = data['customer_data'] or {'name': customer_name, 'company': ''}
@@ -383,8 +389,7 @@ class DataProcessor:
                 'total_value': data['total_value']
             })
         
-        top_customers.sort(key=lambda x: x['total_value'], reverse=True)
-        return top_customers[:10]
+        return heapq.nlargest(10, top_customers, key=itemgetter('total_value'))
     
     @staticmethod
     def get_user_performance(user_id):
@@ -1,6 +1,8 @@
 import firebase_admin
 from firebase_admin import credentials, firestore, auth as admin_auth
+from google.api_core import exceptions, retry
 import json
+import operator
 import os
 from datetime import datetime
 import hashlib
@@ -11,6 +13,11 @@ FIREBASE_CREDENTIALS_PATH = config('FIREBASE_CREDENTIALS_PATH', default='core/se
 FIREBASE_DATABASE_URL = config('FIREBASE_DATABASE_URL', default='')
 FIREBASE_PROJECT_ID = config('FIREBASE_PROJECT_ID', default='')
 
+# Retry batch commits on transient errors (unavailable, throttled, internal)
+# with jittered exponential backoff, giving up after a minute
+COMMIT_RETRY = retry.Retry(predicate=retry.if_transient_error, initial=0.1,
+                           maximum=5.0, multiplier=2.0, deadline=60.0)
+
 # Initialize Firebase Admin SDK
 try:
     cred_path = FIREBASE_CREDENTIALS_PATH
@@ -52,31 +59,87 @@ class FirebaseDB:
     VALID_STATUSES = {'Active', 'Inactive', 'Pending', 'Lead', 'Prospect'}
     VALID_PRIORITIES = {'High', 'Medium', 'Low'}
     VALID_STAGES = {'New', 'Contact', 'Proposal', 'Negotiation', 'Closed Won', 'Closed Lost'}
-    
+
+    # Maximum number of writes Firestore accepts in a single batch commit
+    BATCH_LIMIT = 500
+
+    # Fields stored alongside a lower-cased '<field>_lower' copy, so that
+    # case-insensitive lookups can be answered by Firestore equality/range queries
+    LOWERCASE_FIELDS = {
+        'customers': ('name', 'email', 'company')
+    }
+
+    # Firestore comparison operators, for filtering mock data in local mode
+    _MOCK_OPERATORS = {
+        '==': operator.eq,
+        '!=': operator.ne,
+        '<': lambda a, b: a is not None and a < b,
+        '<=': lambda a, b: a is not None and a <= b,
+        '>': lambda a, b: a is not None and a > b,
+        '>=': lambda a, b: a is not None and a >= b,
+        'in': lambda a, b: a in b,
+        'array_contains': lambda a, b: b in (a or []),
+    }
+
     @staticmethod
     def add_record(collection: str, data: dict) -> str:
         """Add record using DICTIONARY"""
         if db:
             # Add timestamp using STRING
             data['created_at'] = datetime.now().isoformat()
-            data['id'] = ''  # Will be set after creation
-            
+
             # Using LIST to validate required fields
             required_fields = FirebaseDB.COLLECTIONS.get(collection, [])
-            
-            doc_ref = db.collection(collection).add(data)
-            doc_id = doc_ref[1].id
-            
-            # Update with ID
-            db.collection(collection).document(doc_id).update({'id': doc_id})
-            return doc_id
+
+            FirebaseDB._add_lowercase_fields(collection, data)
+
+            # Reserve the ID client-side so the document is written once
+            doc_ref = db.collection(collection).document()
+            data['id'] = doc_ref.id
+            doc_ref.set(data)
+            return doc_ref.id
         else:
             # Local mode - return mock ID
             return f"local_{collection}_{datetime.now().timestamp()}"
     
     @staticmethod
-    def get_records(collection: str, filters: dict = None) -> list:
-        """Get records as LIST of DICTIONARIES"""
+    def add_records_batch(collection: str, records: list) -> list:
+        """Add many records with batched writes; returns their IDs in input order
+
+        A batch that still fails after retries is skipped and its records get None.
+        """
+        if not db:
+            # Local mode - return mock IDs
+            stamp = datetime.now().timestamp()
+            return [f"local_{collection}_{stamp}_{i}" for i in range(len(records))]
+
+        doc_ids = []
+        created_at = datetime.now().isoformat()
+        collection_ref = db.collection(collection)
+
+        # One commit per BATCH_LIMIT documents instead of one round trip per document
+        for start in range(0, len(records), FirebaseDB.BATCH_LIMIT):
+            batch = db.batch()
+            batch_ids = []
+            for data in records[start:start + FirebaseDB.BATCH_LIMIT]:
+                data['created_at'] = created_at
+                FirebaseDB._add_lowercase_fields(collection, data)
+                doc_ref = collection_ref.document()
+                data['id'] = doc_ref.id
+                batch.set(doc_ref, data)
+                batch_ids.append(doc_ref.id)
+            try:
+                batch.commit(retry=COMMIT_RETRY)
+                doc_ids.extend(batch_ids)
+            except Exception as e:
+                # Keep going with the next batch; None marks the records not written
+                print(f"Error committing batch: {e}")
+                doc_ids.extend([None] * len(batch_ids))
+        return doc_ids
+
+    @staticmethod
+    def get_records(collection: str, filters: dict = None, fields: list = None) -> list:
+        """Get records as LIST of DICTIONARIES, optionally projected to fields"""
         if not db:
             # Return mock data for local development
             return FirebaseDB._get_mock_data(collection)
@@ -90,6 +153,10 @@ class FirebaseDB:
                     if value:
                         query = query.where(key, '==', value)
             
+            if fields:
+                # Only transfer the requested fields
+                query = query.select(fields)
+            
             docs = query.limit(100).stream()
             for doc in docs:
                 record = doc.to_dict()
@@ -99,7 +166,142 @@ class FirebaseDB:
             print(f"Error getting records: {e}")
             
         return records
-    
+
+    @staticmethod
+    def get_records_by_ids(collection: str, doc_ids: list, fields: list = None) -> list:
+        """Get the records with these document IDs in one round trip; missing IDs are left out"""
+        if not db:
+            wanted = set(doc_ids)
+            return [record for record in FirebaseDB._get_mock_data(collection)
+                    if record.get('id') in wanted]
+
+        records = []
+        try:
+            collection_ref = db.collection(collection)
+            refs = [collection_ref.document(doc_id) for doc_id in doc_ids]
+            for doc in db.get_all(refs, field_paths=fields):
+                if doc.exists:
+                    record = doc.to_dict()
+                    record['id'] = doc.id
+                    records.append(record)
+        except Exception as e:
+            print(f"Error getting records: {e}")
+        return records
+
+    @staticmethod
+    def get_record(collection: str, doc_id: str):
+        """Get a single record by document ID, or None if it does not exist"""
+        if not db:
+            for record in FirebaseDB._get_mock_data(collection):
+                if record.get('id') == doc_id:
+                    return record
+            return None
+
+        try:
+            doc = db.collection(collection).document(doc_id).get()
+            if doc.exists:
+                record = doc.to_dict()
+                record['id'] = doc.id
+                return record
+        except Exception as e:
+            print(f"Error getting record: {e}")
+        return None
+
+    @staticmethod
+    def query_records(collection: str, filters: list = None, order_by: str = None,
+                      descending: bool = False, limit: int = 100, fields: list = None,
+                      start_after: tuple = None) -> list:
+        """Get records matching (field, op, value) filters, evaluated by Firestore
+
+        Ordered records are tie-broken by document ID. start_after is the
+        (order_by value, id) pair of the last record of the previous page;
+        only records ordered after it are returned.
+        """
+        if not db:
+            # Apply the same filters, ordering and cursor to the mock data
+            records = FirebaseDB._order_mock_data(FirebaseDB._filter_mock_data(collection, filters),
+                                                  order_by, descending, start_after)
+            return records[:limit] if limit else records
+
+        records = []  # LIST to store records
+        try:
+            query = FirebaseDB._build_query(collection, filters, order_by, descending, start_after)
+
+            if fields:
+                query = query.select(fields)
+
+            if limit:
+                query = query.limit(limit)
+
+            for doc in query.stream():
+                record = doc.to_dict()
+                record['id'] = doc.id
+                records.append(record)
+        except exceptions.FailedPrecondition:
+            # Missing composite index (see firestore.indexes.json): fail loudly
+            # rather than render an empty page
+            raise
+        except Exception as e:
+            print(f"Error querying records: {e}")
+
+        return records
+
+    @staticmethod
+    def stream_records(collection: str, filters: list = None, fields: list = None,
+                       order_by: str = None, descending: bool = False, start_after: tuple = None):
+        """Yield records one at a time as Firestore streams them, without a limit
+
+        Ordering and start_after work as in query_records. Errors are raised,
+        not swallowed, so a caller never mistakes a broken stream for the end.
+        """
+        if not db:
+            yield from FirebaseDB._order_mock_data(FirebaseDB._filter_mock_data(collection, filters),
+                                                   order_by, descending, start_after)
+            return
+
+        query = FirebaseDB._build_query(collection, filters, order_by, descending, start_after)
+        if fields:
+            query = query.select(fields)
+
+        for doc in query.stream():
+            record = doc.to_dict()
+            record['id'] = doc.id
+            yield record
+
+    @staticmethod
+    def _build_query(collection: str, filters: list = None, order_by: str = None,
+                     descending: bool = False, start_after: tuple = None):
+        """Filtered Firestore query, ordered by order_by then document ID"""
+        query = db.collection(collection)
+
+        for field, op, value in filters or []:
+            query = query.where(field, op, value)
+
+        if order_by:
+            # The document ID breaks ties, so records sharing a timestamp
+            # (a whole add_records_batch chunk does) are not skipped between pages
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            doc_id = firestore.FieldPath.document_id()
+            query = query.order_by(order_by, direction=direction).order_by(doc_id, direction=direction)
+            if start_after is not None:
+                value, last_id = start_after
+                query = query.start_after({order_by: value,
+                                           doc_id: db.collection(collection).document(last_id)})
+
+        return query
+
+    @staticmethod
+    def count_records(collection: str, filters: list = None) -> int:
+        """Count records matching filters with an aggregation query (no documents transferred)
+
+        Errors are raised rather than reported as a count of 0.
+        """
+        if not db:
+            return len(FirebaseDB._filter_mock_data(collection, filters))
+
+        query = FirebaseDB._build_query(collection, filters)
+        return query.count().get()[0][0].value
+
     @staticmethod
     def update_record(collection: str, doc_id: str, data: dict) -> bool:
         """Update record using DICTIONARY"""
@@ -107,6 +309,7 @@ class FirebaseDB:
             try:
                 # Add update timestamp (STRING)
                 data['updated_at'] = datetime.now().isoformat()
+                FirebaseDB._add_lowercase_fields(collection, data)
                 db.collection(collection).document(doc_id).update(data)
                 return True
             except Exception as e:
@@ -114,6 +317,36 @@ class FirebaseDB:
                 return False
         return False
     
+    @staticmethod
+    def update_records_batch(collection: str, updates: dict) -> int:
+        """Apply {doc_id: data} updates with batched writes; returns how many were written
+
+        A batch that still fails after retries is skipped and does not count.
+        """
+        if not db:
+            return 0
+
+        updated = 0
+        updated_at = datetime.now().isoformat()
+        collection_ref = db.collection(collection)
+        items = list(updates.items())
+
+        # One commit per BATCH_LIMIT documents instead of one round trip per document
+        for start in range(0, len(items), FirebaseDB.BATCH_LIMIT):
+            batch = db.batch()
+            chunk = items[start:start + FirebaseDB.BATCH_LIMIT]
+            for doc_id, data in chunk:
+                data['updated_at'] = updated_at
+                FirebaseDB._add_lowercase_fields(collection, data)
+                batch.update(collection_ref.document(doc_id), data)
+            try:
+                batch.commit(retry=COMMIT_RETRY)
+                updated += len(chunk)
+            except Exception as e:
+                # Keep going with the next batch
+                print(f"Error committing batch: {e}")
+        return updated
+
     @staticmethod
     def delete_record(collection: str, doc_id: str) -> bool:
         """Delete record"""
@@ -126,6 +359,15 @@ class FirebaseDB:
                 return False
         return False
     
+    @staticmethod
+    def delete_collection(collection: str) -> int:
+        """Delete every document in a collection without reading document bodies; returns how many"""
+        if not db:
+            return 0
+
+        # recursive_delete streams document references only and deletes them in batches
+        return db.recursive_delete(db.collection(collection))
+    
     @staticmethod
     def get_statistics(collection: str) -> dict:
         """Get statistics using various data structures"""
@@ -154,15 +396,46 @@ class FirebaseDB:
         
         return stats
     
+    @staticmethod
+    def _add_lowercase_fields(collection: str, data: dict) -> None:
+        """Refresh the '<field>_lower' copies for any lower-cased fields being written"""
+        for field in FirebaseDB.LOWERCASE_FIELDS.get(collection, ()):
+            if data.get(field) is not None:
+                data[f'{field}_lower'] = str(data[field]).strip().lower()
+    
+    @staticmethod
+    def _filter_mock_data(collection: str, filters: list = None) -> list:
+        """Apply (field, op, value) filters to the mock data"""
+        return [r for r in FirebaseDB._get_mock_data(collection)
+                if all(FirebaseDB._MOCK_OPERATORS[op](r.get(field), value)
+                       for field, op, value in filters or [])]
+    
+    @staticmethod
+    def _order_mock_data(records: list, order_by: str = None, descending: bool = False,
+                         start_after: tuple = None) -> list:
+        """Order mock data by (order_by, id) and apply a query_records cursor"""
+        if not order_by:
+            return records
+        key = lambda r: (r.get(order_by, ''), r.get('id', ''))
+        records = sorted(records, key=key, reverse=descending)
+        if start_after is not None:
+            records = [r for r in records
+                       if (key(r) < tuple(start_after) if descending else key(r) > tuple(start_after))]
+        return records
+    
     @staticmethod
     def _get_mock_data(collection: str) -> list:
         """Return mock data for local development"""
         mock_data = {
             'customers': [
                 {'id': '1', 'name': 'John Doe', 'email': 'john@example.com', 
-                 'company': 'Tech Corp', 'status': 'Active', 'value': 50000},
+                 'company': 'Tech Corp', 'status': 'Active', 'value': 50000,
+                 'name_lower': 'john doe', 'email_lower': 'john@example.com',
+                 'company_lower': 'tech corp'},
                 {'id': '2', 'name': 'Jane Smith', 'email': 'jane@example.com', 
-                 'company': 'Design Studio', 'status': 'Lead', 'value': 30000}
+                 'company': 'Design Studio', 'status': 'Lead', 'value': 30000,
+                 'name_lower': 'jane smith', 'email_lower': 'jane@example.com',
+                 'company_lower': 'design studio'}
             ],
             'employees': [
                 {'id': '1', 'name': 'Alice Johnson', 'email': 'alice@company.com',
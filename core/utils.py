@@ -2,10 +2,12 @@
 import hashlib
 import random
 import string
+import time
 from datetime import datetime, timedelta
 import re
 from typing import Dict, List, Any, Optional
 import json
+from django.core.cache import cache
 
 def generate_unique_id(prefix: str = '') -> str:
     """Generate a unique ID with optional prefix"""
@@ -13,6 +15,26 @@ def generate_unique_id(prefix: str = '') -> str:
     random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
     return f"{prefix}{timestamp}{random_str}"
 
+def get_cache_version(namespace: str) -> int:
+    """Get the current cache version stamp for a namespace"""
+    # A missing stamp starts from the clock, never from a value an evicted stamp
+    # may already have used, so entries cached under that stamp stay unreachable
+    return cache.get_or_set(f"cache_version_{namespace}", time.time_ns, timeout=None)
+
+def bump_cache_version(namespace: str) -> None:
+    """Invalidate every cache key built with the namespace's version stamp
+
+    Reaches every worker only with a shared cache backend (REDIS_URL);
+    with the default LocMemCache it invalidates this process's entries.
+    """
+    key = f"cache_version_{namespace}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key expired or was evicted - start a fresh version that no earlier
+        # stamp can have used
+        cache.set(key, time.time_ns(), timeout=None)
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
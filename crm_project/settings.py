@@ -60,6 +60,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / config('DATABASE_NAME', default='db_sessions_only.sqlite3'),
+        # Reuse connections across requests (sessions are read on every request)
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -99,10 +102,14 @@ FIREBASE_PROJECT_ID = config('FIREBASE_PROJECT_ID', default='')
 FIREBASE_STORAGE_BUCKET = config('FIREBASE_STORAGE_BUCKET', default='')
 
 # Cache settings (optional, for performance)
+# LocMemCache is per process, so a cache-version bump on write only reaches the
+# worker that handled it; set REDIS_URL to share one cache across all workers
+REDIS_URL = config('REDIS_URL', default='')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': ('django.core.cache.backends.redis.RedisCache' if REDIS_URL
+                    else 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': REDIS_URL or 'unique-snowflake',
         'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
     }
 }
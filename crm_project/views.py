@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import json
 
 from core.firebase_config import FirebaseDB, FirebaseAuth
+from core.utils import bump_cache_version
 from analytics.chart_generator import ChartGenerator
 
 # Using different data structures as required
@@ -256,6 +257,7 @@ def add_customer(request):
     doc_id = FirebaseDB.add_record('customers', customer_data)
     
     if doc_id:
+        bump_cache_version('customers')
         messages.success(request, '✅ Customer added successfully!')
         return redirect('customers')
     
@@ -308,6 +310,7 @@ def add_deal(request):
     doc_id = FirebaseDB.add_record('deals', deal_data)
     
     if doc_id:
+        bump_cache_version('deals')
         messages.success(request, '✅ Deal added successfully!')
         return redirect('deals')
     
@@ -353,6 +356,7 @@ def update_record(request, collection, doc_id):
     success = FirebaseDB.update_record(collection, doc_id, update_data)
     
     if success:
+        bump_cache_version(collection)
         return JsonResponse({'success': True})
     
     return JsonResponse({'error': 'Failed to update'}, status=500)
@@ -366,6 +370,7 @@ def delete_record(request, collection, doc_id):
     success = FirebaseDB.delete_record(collection, doc_id)
     
     if success:
+        bump_cache_version(collection)
         return JsonResponse({'success': True})
     
     return JsonResponse({'error': 'Failed to delete'}, status=500)
@@ -379,6 +384,7 @@ def delete_record(request, collection, doc_id):
     success = FirebaseDB.delete_record(collection, doc_id)
     
     if success:
+        bump_cache_version(collection)
         messages.success(request, '✅ Record deleted successfully!')
         return JsonResponse({'success': True})
     
@@ -495,6 +501,7 @@ def edit_customer(request, customer_id):
     success = FirebaseDB.update_record('customers', customer_id, update_data)
     
     if success:
+        bump_cache_version('customers')
         messages.success(request, '✅ Customer updated successfully!')
         return redirect('customers')
     else:
@@ -595,6 +602,7 @@ def edit_deal(request, deal_id):
     success = FirebaseDB.update_record('deals', deal_id, update_data)
     
     if success:
+        bump_cache_version('deals')
         messages.success(request, '✅ Deal updated successfully!')
         return redirect('deals')
     else:
@@ -1,7 +1,11 @@
 # Firebase collection schemas and utilities for customer data
+import re
 from datetime import datetime
 from typing import Dict, List, Optional
 
+# Compiled once; checked for every customer write and import row
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
 class CustomerSchema:
     """Firebase schema definition for customers collection"""
     
@@ -15,6 +19,7 @@ class CustomerSchema:
     @staticmethod
     def create_customer_document(data: dict) -> dict:
         """Create a properly formatted customer document for Firebase"""
+        now = datetime.now().isoformat()
         return {
             'id': data.get('id', ''),
             'name': str(data.get('name', '')),
@@ -23,8 +28,8 @@ class CustomerSchema:
             'company': str(data.get('company', '')),
             'status': data.get('status', 'Lead'),
             'assigned_to': str(data.get('assigned_to', '')),
-            'created_date': data.get('created_date', datetime.now().isoformat()),
-            'updated_date': datetime.now().isoformat(),
+            'created_date': data.get('created_date', now),
+            'updated_date': now,
             'notes': str(data.get('notes', '')),
             'tags': data.get('tags', []),
             'address': str(data.get('address', '')),
@@ -50,15 +55,17 @@ class CustomerSchema:
             return False, "Email is required"
             
         # Basic email validation
-        email = data.get('email', '')
-        if '@' not in email or '.' not in email:
+        if not _EMAIL_RE.match(data['email']):
             return False, "Invalid email format"
             
-        if data.get('status') not in CustomerSchema.STATUS_CHOICES:
+        if data.get('status') not in _STATUS_SET:
             return False, "Invalid status"
             
         return True, "Valid"
 
+# SET for O(1) status membership checks
+_STATUS_SET = frozenset(CustomerSchema.STATUS_CHOICES)
+
 class InteractionSchema:
     """Firebase schema for customer interactions"""
     
@@ -83,6 +90,7 @@ class InteractionSchema:
     @staticmethod
     def create_interaction_document(data: dict) -> dict:
         """Create interaction document"""
+        now = datetime.now().isoformat()
         return {
             'id': data.get('id', ''),
             'customer_id': str(data.get('customer_id', '')),
@@ -90,14 +98,14 @@ class InteractionSchema:
             'type': data.get('type', 'Other'),
             'subject': str(data.get('subject', '')),
             'description': str(data.get('description', '')),
-            'date': data.get('date', datetime.now().isoformat()),
+            'date': data.get('date', now),
             'duration': str(data.get('duration', '')),
             'follow_up_date': data.get('follow_up_date', ''),
             'follow_up_completed': bool(data.get('follow_up_completed', False)),
             'outcome': data.get('outcome', ''),
             'location': str(data.get('location', '')),
             'attachments': data.get('attachments', []),
-            'created_date': data.get('created_date', datetime.now().isoformat())
+            'created_date': data.get('created_date', now)
         }
 
 class CustomerTagSchema:
@@ -120,6 +128,7 @@ class CustomerNoteSchema:
     @staticmethod
     def create_note_document(data: dict) -> dict:
         """Create customer note document"""
+        now = datetime.now().isoformat()
         return {
             'id': data.get('id', ''),
             'customer_id': str(data.get('customer_id', '')),
@@ -127,8 +136,8 @@ class CustomerNoteSchema:
             'title': str(data.get('title', '')),
             'content': str(data.get('content', '')),
             'is_important': bool(data.get('is_important', False)),
-            'created_date': data.get('created_date', datetime.now().isoformat()),
-            'updated_date': datetime.now().isoformat()
+            'created_date': data.get('created_date', now),
+            'updated_date': now
         }
 
 # Firebase collection names
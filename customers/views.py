@@ -1,59 +1,140 @@
 # Customer views and logic - Firebase Only
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_http_methods
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods, etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_cookie
 from django.contrib import messages
+from django.core.cache import cache
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import json
+from itertools import chain, islice
+from operator import itemgetter
+import csv
+import hashlib
+import heapq
+import re
 
 from .models import CustomerSchema, InteractionSchema, CustomerTagSchema
 from core.firebase_config import FirebaseDB
 from core.decorators import role_required, log_activity, validate_json_request
-from core.utils import export_to_csv, export_to_pdf
+from core.utils import export_to_csv, export_to_pdf, get_cache_version, bump_cache_version
+
+# Seconds to keep computed analytics in the cache
+ANALYTICS_CACHE_TIMEOUT = 60
+
+# Seconds to keep search API results in the cache
+SEARCH_CACHE_TIMEOUT = 45
+
+# Customer statuses in display order, frozen once for the analytics counters
+_STATUS_TUPLE = tuple(CustomerSchema.STATUS_CHOICES)
+
+# Analytics period -> length in days (anything else falls back to a year)
+PERIOD_DAYS = {'week': 7, 'month': 30, 'quarter': 90, 'year': 365}
+
+# Most customers the list search scans for one page before handing back a cursor
+SEARCH_SCAN_LIMIT = 1000
+
+# Fields returned by the search API
+SEARCH_RESULT_FIELDS = ['name', 'email', 'company', 'status']
+
+# Most results the search API returns for one request
+SEARCH_MAX_LIMIT = 50
+
+# Lower-cased fields the search API prefix-matches against
+SEARCH_PREFIX_FIELDS = ['name_lower', 'email_lower', 'company_lower']
+
+# Column headers for the customer CSV export
+CUSTOMER_EXPORT_FIELDS = ['Name', 'Email', 'Phone', 'Company', 'Status', 'Assigned To',
+                          'Created Date', 'Total Deal Value', 'Interactions']
+
+def _email_taken(email, exclude_id=None):
+    """Return True if another customer already uses this email (case-insensitive)
+
+    Read errors are raised: query_records would swallow them and make the email look free.
+    """
+    matches = FirebaseDB.stream_records('customers', [('email_lower', '==', email.strip().lower())],
+                                        fields=['email_lower'])
+    return any(m['id'] != exclude_id for m in islice(matches, 2))
+
+class _Echo:
+    """File-like object that hands back what is written, for streaming CSV"""
+    def write(self, value):
+        return value
 
 @login_required
 @log_activity('view_customers')
 def customer_list(request):
     """Display list of customers with search and filtering using Firebase"""
-    customers = FirebaseDB.get_records('customers')
-    
-    # Search functionality
-    search_query = request.GET.get('search', '')
-    if search_query:
-        customers = [c for c in customers if
-                    search_query.lower() in c.get('name', '').lower() or
-                    search_query.lower() in c.get('email', '').lower() or
-                    search_query.lower() in c.get('company', '').lower()]
-    
-    # Filter by status
+    # Status and owner filters and the ordering are evaluated by Firestore
+    filters = []
     status_filter = request.GET.get('status', '')
     if status_filter:
-        customers = [c for c in customers if c.get('status') == status_filter]
+        filters.append(('status', '==', status_filter))
     
     # Filter by assigned user (for sales reps)
     if not request.user.is_staff:
-        user_email = request.user.email
-        customers = [c for c in customers if c.get('assigned_to') == user_email]
-    
-    # Sort by created_date (newest first)
-    customers.sort(key=lambda x: x.get('created_date', ''), reverse=True)
+        filters.append(('assigned_to', '==', request.user.email))
     
-    # Simple pagination
-    page = int(request.GET.get('page', 1))
+    # Cursor pagination: the cursor is the (created_at, id) pair of the last customer
+    # shown (created_at is set on every write path, unlike created_date)
+    cursor = None
+    if request.GET.get('cursor') and request.GET.get('cursor_id'):
+        cursor = (request.GET['cursor'], request.GET['cursor_id'])
     page_size = 20
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    page_customers = customers[start_idx:end_idx]
+    search_query = request.GET.get('search', '')
+    
+    search_truncated = False
+    if search_query:
+        # Firestore cannot substring-match, so stream from the cursor and match here,
+        # stopping once one more than a page has matched or the scan budget is spent
+        pattern = re.compile(re.escape(search_query.strip().lower()))
+        stream = FirebaseDB.stream_records('customers', filters,
+                                           order_by='created_at', descending=True,
+                                           start_after=cursor)
+        customers = []
+        scanned = 0
+        last_scanned = {}
+        for c in islice(stream, SEARCH_SCAN_LIMIT):
+            scanned += 1
+            last_scanned = c
+            if pattern.search(f"{c.get('name_lower', '')}\0{c.get('email_lower', '')}\0"
+                              f"{c.get('company_lower', '')}"):
+                customers.append(c)
+                if len(customers) > page_size:
+                    break
+        stream.close()
+        # Out of budget before a full page matched: more customers may match further on
+        search_truncated = len(customers) <= page_size and scanned == SEARCH_SCAN_LIMIT
+        total_count = None
+    else:
+        # Newest first; one extra document tells us whether there is a next page
+        customers = FirebaseDB.query_records('customers', filters,
+                                             order_by='created_at', descending=True,
+                                             limit=page_size + 1, start_after=cursor)
+        total_count = FirebaseDB.count_records('customers', filters)
+    
+    page_customers = customers[:page_size]
+    has_next = len(customers) > page_size
+    last = page_customers[-1] if has_next else {}
+    if search_truncated:
+        # The next page resumes the scan after the last customer looked at
+        has_next = True
+        last = last_scanned
     
     context = {
         'customers': page_customers,
         'search_query': search_query,
         'status_filter': status_filter,
-        'total_count': len(customers),
-        'has_next': end_idx < len(customers),
-        'has_previous': start_idx > 0,
-        'page': page
+        'total_count': total_count,
+        'has_next': has_next,
+        'search_truncated': search_truncated,
+        'cursor': cursor[0] if cursor else None,
+        'cursor_id': cursor[1] if cursor else None,
+        'next_cursor': last.get('created_at'),
+        'next_cursor_id': last.get('id')
     }
     
     return render(request, 'customers/customer_list.html', context)
@@ -62,14 +143,7 @@ def customer_list(request):
 @log_activity('view_customer_detail')
 def customer_detail(request, customer_id):
     """Display detailed customer information using Firebase"""
-    customers = FirebaseDB.get_records('customers')
-    customer = None
-    
-    # Find customer by ID
-    for c in customers:
-        if c.get('id') == customer_id:
-            customer = c
-            break
+    customer = FirebaseDB.get_record('customers', customer_id)
     
     if not customer:
         messages.error(request, "Customer not found.")
@@ -80,18 +154,19 @@ def customer_detail(request, customer_id):
         messages.error(request, "You don't have permission to view this customer.")
         return redirect('customer_list')
     
-    # Get recent interactions
-    interactions = FirebaseDB.get_records('interactions')
-    customer_interactions = [i for i in interactions if i.get('customer_id') == customer_id]
-    customer_interactions.sort(key=lambda x: x.get('date', ''), reverse=True)
-    customer_interactions = customer_interactions[:10]
-    
-    # Get deals
-    deals = FirebaseDB.get_records('deals')
-    customer_deals = [d for d in deals if d.get('customer') == customer.get('name')]
+    # The 10 most recent interactions and the customer's deals are independent
+    # reads, so issue them concurrently on a pool sized to this request
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        interactions_future = pool.submit(
+            FirebaseDB.query_records, 'interactions', [('customer_id', '==', customer_id)],
+            order_by='date', descending=True, limit=10)
+        deals_future = pool.submit(
+            FirebaseDB.query_records, 'deals', [('customer', '==', customer.get('name'))])
+        customer_interactions = interactions_future.result()
+        customer_deals = deals_future.result()
     
     # Calculate metrics
-    total_value = sum([d.get('value', 0) for d in customer_deals])
+    total_value = sum(d.get('value', 0) for d in customer_deals)
     
     context = {
         'customer': customer,
@@ -139,21 +214,20 @@ def customer_create(request):
             })
         
         # Check for duplicate email
-        existing_customers = FirebaseDB.get_records('customers')
-        for existing in existing_customers:
-            if existing.get('email', '').lower() == customer_data['email'].lower():
-                messages.error(request, "❌ A customer with this email already exists.")
-                return render(request, 'customers/customer_form.html', {
-                    'form_data': customer_data,
-                    'action': 'Create',
-                    'statuses': CustomerSchema.STATUS_CHOICES
-                })
+        if _email_taken(customer_data['email']):
+            messages.error(request, "❌ A customer with this email already exists.")
+            return render(request, 'customers/customer_form.html', {
+                'form_data': customer_data,
+                'action': 'Create',
+                'statuses': CustomerSchema.STATUS_CHOICES
+            })
         
         # Create customer document
         customer_doc = CustomerSchema.create_customer_document(customer_data)
         doc_id = FirebaseDB.add_record('customers', customer_doc)
         
         if doc_id:
+            bump_cache_version('customers')
             messages.success(request, f"✅ Customer '{customer_data['name']}' created successfully!")
             return redirect('customer_detail', customer_id=doc_id)
         else:
@@ -170,14 +244,7 @@ def customer_create(request):
 @log_activity('update_customer')
 def customer_update(request, customer_id):
     """Update customer information using Firebase"""
-    customers = FirebaseDB.get_records('customers')
-    customer = None
-    
-    # Find customer by ID
-    for c in customers:
-        if c.get('id') == customer_id:
-            customer = c
-            break
+    customer = FirebaseDB.get_record('customers', customer_id)
     
     if not customer:
         messages.error(request, "Customer not found.")
@@ -220,21 +287,20 @@ def customer_update(request, customer_id):
             })
         
         # Check for duplicate email (excluding current customer)
-        all_customers = FirebaseDB.get_records('customers')
-        for existing in all_customers:
-            if (existing.get('id') != customer_id and 
-                existing.get('email', '').lower() == update_data['email'].lower()):
-                messages.error(request, "❌ Another customer with this email already exists.")
-                return render(request, 'customers/customer_form.html', {
-                    'customer': customer,
-                    'action': 'Update',
-                    'statuses': CustomerSchema.STATUS_CHOICES
-                })
+        if _email_taken(update_data['email'], exclude_id=customer_id):
+            messages.error(request, "❌ Another customer with this email already exists.")
+            return render(request, 'customers/customer_form.html', {
+                'customer': customer,
+                'action': 'Update',
+                'statuses': CustomerSchema.STATUS_CHOICES
+            })
         
-        # Update in Firebase
-        success = FirebaseDB.update_record('customers', customer_id, update_data)
+        # Update in Firebase, sending only the fields that changed
+        changes = {k: v for k, v in update_data.items() if customer.get(k) != v}
+        success = FirebaseDB.update_record('customers', customer_id, changes)
         
         if success:
+            bump_cache_version('customers')
             messages.success(request, f"✅ Customer '{update_data['name']}' updated successfully!")
             return redirect('customer_detail', customer_id=customer_id)
         else:
@@ -253,14 +319,7 @@ def customer_update(request, customer_id):
 @log_activity('delete_customer')
 def customer_delete(request, customer_id):
     """Delete a customer using Firebase"""
-    customers = FirebaseDB.get_records('customers')
-    customer = None
-    
-    # Find customer by ID
-    for c in customers:
-        if c.get('id') == customer_id:
-            customer = c
-            break
+    customer = FirebaseDB.get_record('customers', customer_id)
     
     if not customer:
         messages.error(request, "Customer not found.")
@@ -270,6 +329,7 @@ def customer_delete(request, customer_id):
         success = FirebaseDB.delete_record('customers', customer_id)
         
         if success:
+            bump_cache_version('customers')
             customer_name = customer.get('name', 'Unknown')
             messages.success(request, f"✅ Customer '{customer_name}' deleted successfully!")
             return redirect('customer_list')
@@ -282,14 +342,7 @@ def customer_delete(request, customer_id):
 @log_activity('add_interaction')
 def interaction_add(request, customer_id):
     """Add a new interaction for a customer using Firebase"""
-    customers = FirebaseDB.get_records('customers')
-    customer = None
-    
-    # Find customer by ID
-    for c in customers:
-        if c.get('id') == customer_id:
-            customer = c
-            break
+    customer = FirebaseDB.get_record('customers', customer_id)
     
     if not customer:
         messages.error(request, "Customer not found.")
@@ -334,42 +387,56 @@ def interaction_add(request, customer_id):
 @require_http_methods(["GET"])
 def customer_search_api(request):
     """API endpoint for customer search using Firebase"""
-    query = request.GET.get('q', '')
-    limit = int(request.GET.get('limit', 10))
-    
-    if len(query) < 2:
+    # Normalise before validating so a run of spaces does not match everyone
+    q = request.GET.get('q', '').strip().lower()
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    # A Firestore limit of 0 or less means no limit, so keep it in range
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    
+    if len(q) < 2:
         return JsonResponse({'results': []})
     
-    customers = FirebaseDB.get_records('customers')
-    
-    # Filter customers based on search query
-    filtered_customers = []
-    for customer in customers:
-        name = customer.get('name', '').lower()
-        email = customer.get('email', '').lower()
-        company = customer.get('company', '').lower()
-        
-        if (query.lower() in name or 
-            query.lower() in email or 
-            query.lower() in company):
-            filtered_customers.append(customer)
-    
-    # Filter by assigned user if not staff
-    if not request.user.is_staff:
-        user_email = request.user.email
-        filtered_customers = [c for c in filtered_customers if c.get('assigned_to') == user_email]
-    
-    # Limit results
-    filtered_customers = filtered_customers[:limit]
-    
-    results = [{
-        'id': c.get('id'),
-        'name': c.get('name'),
-        'email': c.get('email'),
-        'company': c.get('company'),
-        'status': c.get('status')
-    } for c in filtered_customers]
+    # Staff see every customer, so they can share cached results
+    scope = 'staff' if request.user.is_staff else request.user.id
+    query_hash = hashlib.md5(q.encode()).hexdigest()
+    cache_key = f"customer_search_{get_cache_version('customers')}_{scope}_{query_hash}_{limit}"
+    results = cache.get(cache_key)
+    if results is not None:
+        return JsonResponse({'results': results})
+    
+    # Prefix-match the lower-cased name, email and company fields in Firestore,
+    # one query per field, run concurrently
+    owner_filter = [] if request.user.is_staff else [('assigned_to', '==', request.user.email)]
+    
+    def prefix_query(field):
+        filters = owner_filter + [(field, '>=', q), (field, '<', q + '\uf8ff')]
+        return FirebaseDB.query_records('customers', filters, order_by=field,
+                                        limit=limit, fields=SEARCH_RESULT_FIELDS)
+    
+    with ThreadPoolExecutor(max_workers=len(SEARCH_PREFIX_FIELDS)) as pool:
+        matches = list(pool.map(prefix_query, SEARCH_PREFIX_FIELDS))
+    
+    # Merge in field order, dropping customers matched by more than one field
+    results = []
+    seen = set()
+    for c in chain.from_iterable(matches):
+        if len(results) >= limit:
+            break
+        if c['id'] in seen:
+            continue
+        seen.add(c['id'])
+        results.append({
+            'id': c.get('id'),
+            'name': c.get('name'),
+            'email': c.get('email'),
+            'company': c.get('company'),
+            'status': c.get('status')
+        })
     
+    cache.set(cache_key, results, SEARCH_CACHE_TIMEOUT)
     return JsonResponse({'results': results})
 
 @login_required
@@ -377,13 +444,12 @@ def customer_search_api(request):
 @require_http_methods(["POST"])
 def customer_quick_add_api(request):
     """API endpoint for quick customer addition using Firebase"""
-    data = json.loads(request.body)
+    # Body was already parsed by validate_json_request
+    data = request.json
     
     # Check if customer already exists
-    existing_customers = FirebaseDB.get_records('customers')
-    for existing in existing_customers:
-        if existing.get('email', '').lower() == data['email'].lower():
-            return JsonResponse({'error': 'Customer with this email already exists'}, status=400)
+    if _email_taken(data['email']):
+        return JsonResponse({'error': 'Customer with this email already exists'}, status=400)
     
     customer_data = {
         'name': data['name'],
@@ -399,6 +465,7 @@ def customer_quick_add_api(request):
     doc_id = FirebaseDB.add_record('customers', customer_doc)
     
     if doc_id:
+        bump_cache_version('customers')
         return JsonResponse({
             'id': doc_id,
             'name': customer_data['name'],
@@ -414,36 +481,35 @@ def customer_export(request):
     """Export customers to CSV or PDF using Firebase"""
     export_format = request.GET.get('format', 'csv')
     
-    customers = FirebaseDB.get_records('customers')
-    
-    # Apply filters from request
+    # Apply filters from request in Firestore
+    filters = []
     status_filter = request.GET.get('status', '')
     if status_filter:
-        customers = [c for c in customers if c.get('status') == status_filter]
+        filters.append(('status', '==', status_filter))
+    
+    # Documents are pulled from Firestore lazily as rows are written
+    customers = FirebaseDB.stream_records('customers', filters)
     
     if export_format == 'csv':
-        data = [{
-            'Name': c.get('name', ''),
-            'Email': c.get('email', ''),
-            'Phone': c.get('phone', ''),
-            'Company': c.get('company', ''),
-            'Status': c.get('status', ''),
-            'Assigned To': c.get('assigned_to', ''),
-            'Created Date': c.get('created_date', '')[:10] if c.get('created_date') else '',
-            'Total Deal Value': c.get('total_deal_value', 0),
-            'Interactions': c.get('interaction_count', 0)
-        } for c in customers]
+        writer = csv.writer(_Echo())
         
-        # Create CSV file (simplified - in production use proper CSV export)
-        import csv
-        import io
+        def csv_rows():
+            yield writer.writerow(CUSTOMER_EXPORT_FIELDS)
+            for c in customers:
+                yield writer.writerow([
+                    c.get('name', ''),
+                    c.get('email', ''),
+                    c.get('phone', ''),
+                    c.get('company', ''),
+                    c.get('status', ''),
+                    c.get('assigned_to', ''),
+                    c.get('created_date', '')[:10] if c.get('created_date') else '',
+                    c.get('total_deal_value', 0),
+                    c.get('interaction_count', 0)
+                ])
         
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=data[0].keys() if data else [])
-        writer.writeheader()
-        writer.writerows(data)
-        
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
+        # Rows are encoded as the response is sent, never buffered in full
+        response = StreamingHttpResponse(csv_rows(), content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="customers.csv"'
         return response
     
@@ -456,52 +522,47 @@ def customer_export(request):
     
     return JsonResponse({'error': 'Invalid export format'}, status=400)
 
-@login_required
-def customer_analytics(request):
-    """Customer analytics dashboard using Firebase"""
-    # Get date range
-    period = request.GET.get('period', 'month')
-    
-    customers = FirebaseDB.get_records('customers')
-    
-    # Calculate metrics
-    total_customers = len(customers)
-    
-    # Customers by status
-    status_counts = {}
-    for status in CustomerSchema.STATUS_CHOICES:
-        status_counts[status] = len([c for c in customers if c.get('status') == status])
-    
-    # New customers this period
-    if period == 'week':
-        start_date = datetime.now() - timedelta(weeks=1)
-    elif period == 'month':
-        start_date = datetime.now() - timedelta(days=30)
-    elif period == 'quarter':
-        start_date = datetime.now() - timedelta(days=90)
-    else:
-        start_date = datetime.now() - timedelta(days=365)
-    
+def _build_customer_analytics(period):
+    """Compute the customer analytics context for a period"""
+    # New customers this period (stored dates are naive local ISO strings)
+    start_date = datetime.now() - timedelta(days=PERIOD_DAYS.get(period, 365))
     start_date_str = start_date.isoformat()
-    new_customers = len([c for c in customers if c.get('created_date', '') >= start_date_str])
     
-    # Top customers by deal value
-    deals = FirebaseDB.get_records('deals')
-    customer_values = {}
+    # Every count is a Firestore aggregation query; none of them transfer
+    # documents, and all of them run concurrently with the two reads below.
+    # One worker per background read, so the request never queues on its own pool
+    with ThreadPoolExecutor(max_workers=len(_STATUS_TUPLE) + 3) as pool:
+        total_future = pool.submit(FirebaseDB.count_records, 'customers')
+        new_future = pool.submit(FirebaseDB.count_records, 'customers',
+                                 [('created_date', '>=', start_date_str)])
+        status_futures = {status: pool.submit(FirebaseDB.count_records, 'customers',
+                                              [('status', '==', status)])
+                          for status in _STATUS_TUPLE}
+        deals_future = pool.submit(FirebaseDB.get_records, 'deals')
+        customers = FirebaseDB.get_records('customers', fields=['name', 'company'])
+        
+        # Calculate metrics
+        total_customers = total_future.result()
+        new_customers = new_future.result()
+        status_counts = {status: future.result() for status, future in status_futures.items()}
+        
+        # Top customers by deal value
+        deals = deals_future.result()
     
+    # Deal value and count per customer name, in one pass over deals
+    deal_totals = defaultdict(lambda: [0, 0])
     for deal in deals:
         customer_name = deal.get('customer', '')
         if customer_name:
-            if customer_name not in customer_values:
-                customer_values[customer_name] = 0
-            customer_values[customer_name] += deal.get('value', 0)
+            totals = deal_totals[customer_name]
+            totals[0] += deal.get('value', 0)
+            totals[1] += 1
     
     # Find top customers
     top_customers = []
     for customer in customers:
         customer_name = customer.get('name', '')
-        total_value = customer_values.get(customer_name, 0)
-        deal_count = len([d for d in deals if d.get('customer') == customer_name])
+        total_value, deal_count = deal_totals.get(customer_name, (0, 0))
         
         top_customers.append({
             'name': customer_name,
@@ -510,15 +571,38 @@ def customer_analytics(request):
             'deal_count': deal_count
         })
     
-    top_customers.sort(key=lambda x: x['total_value'], reverse=True)
-    top_customers = top_customers[:10]
+    top_customers = heapq.nlargest(10, top_customers, key=itemgetter('total_value'))
     
-    context = {
+    return {
         'total_customers': total_customers,
         'status_counts': status_counts,
         'new_customers': new_customers,
         'top_customers': top_customers,
         'period': period
     }
+
+def _analytics_etag(request):
+    """ETag for the analytics page: changes whenever a customer or deal is written"""
+    return (f"{get_cache_version('customers')}-{get_cache_version('deals')}-"
+            f"{request.user.pk}-{request.GET.get('period', 'month')}")
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@etag(_analytics_etag)
+def customer_analytics(request):
+    """Customer analytics dashboard using Firebase"""
+    # Get date range
+    period = request.GET.get('period', 'month')
+    
+    # Short TTL cache absorbs dashboard reloads; the version stamps drop it
+    # as soon as a customer or deal is written
+    cache_key = (f"cust_analytics:{get_cache_version('customers')}:"
+                 f"{get_cache_version('deals')}:{period}")
+    context = cache.get_or_set(
+        cache_key,
+        lambda: _build_customer_analytics(period),
+        ANALYTICS_CACHE_TIMEOUT
+    )
     
     return render(request, 'customers/analytics.html', context)
\ No newline at end of file
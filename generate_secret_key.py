@@ -3,40 +3,45 @@
 Generate a secure SECRET_KEY for Django
 """
 
+import os
+import re
 import secrets
-import string
+import stat
+import tempfile
+from pathlib import Path
 
 def generate_secret_key(length=50):
     """Generate a secure random string for Django SECRET_KEY"""
-    characters = string.ascii_letters + string.digits + "!@#$%^&*(-_=+)"
-    return ''.join(secrets.choice(characters) for _ in range(length))
+    # One CSPRNG read, URL-safe base64 encoded (about 6 bits per character)
+    return secrets.token_urlsafe(length)[:length]
 
-def update_env_file(secret_key):
+def update_env_file(secret_key, env_path='.env'):
     """Update .env file with new SECRET_KEY"""
+    path = Path(env_path)
     try:
-        # Read existing .env
-        with open('.env', 'r') as f:
-            lines = f.readlines()
-        
-        # Update SECRET_KEY line
-        updated = False
-        for i, line in enumerate(lines):
-            if line.startswith('SECRET_KEY='):
-                lines[i] = f'SECRET_KEY={secret_key}\n'
-                updated = True
-                break
-        
-        # If SECRET_KEY not found, add it
-        if not updated:
-            lines.insert(0, f'SECRET_KEY={secret_key}\n')
-        
-        # Write back
-        with open('.env', 'w') as f:
-            f.writelines(lines)
-        
-        return True
+        text = path.read_text()
     except FileNotFoundError:
         return False
+    
+    # Update SECRET_KEY line, or add it at the top if it is missing
+    text, replaced = re.subn(r'^SECRET_KEY=.*$', lambda _: f'SECRET_KEY={secret_key}',
+                             text, count=1, flags=re.MULTILINE)
+    if not replaced:
+        text = f'SECRET_KEY={secret_key}\n' + text
+    
+    # Write a sibling temp file and rename it over .env, so a crash mid-write
+    # can never leave a truncated file behind
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.env.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    
+    return True
 
 if __name__ == '__main__':
     print("\n🔐 Django SECRET_KEY Generator")
@@ -7,6 +7,7 @@ Run this to set up Firebase collections and initial data
 import os
 import sys
 import django
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decouple import config
 
@@ -75,12 +76,6 @@ def initialize_firebase():
         }
     ]
     
-    print("Adding sample customers...")
-    for customer in sample_customers:
-        doc_id = FirebaseDB.add_record('customers', customer)
-        if doc_id:
-            print(f"  ✓ Added customer: {customer['name']}")
-    
     # Sample deals
     sample_deals = [
         {
@@ -115,12 +110,6 @@ def initialize_firebase():
         }
     ]
     
-    print("\nAdding sample deals...")
-    for deal in sample_deals:
-        doc_id = FirebaseDB.add_record('deals', deal)
-        if doc_id:
-            print(f"  ✓ Added deal: {deal['title']}")
-    
     # Sample tasks
     sample_tasks = [
         {
@@ -141,11 +130,28 @@ def initialize_firebase():
         }
     ]
     
-    print("\nAdding sample tasks...")
-    for task in sample_tasks:
-        doc_id = FirebaseDB.add_record('tasks', task)
+    # The three collections are independent, so commit their batches concurrently
+    print("Adding sample customers, deals and tasks...")
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        customers_future = pool.submit(FirebaseDB.add_records_batch, 'customers', sample_customers)
+        deals_future = pool.submit(FirebaseDB.add_records_batch, 'deals', sample_deals)
+        tasks_future = pool.submit(FirebaseDB.add_records_batch, 'tasks', sample_tasks)
+    
+    for customer, doc_id in zip(sample_customers, customers_future.result()):
+        if doc_id:
+            print(f"  ✓ Added customer: {customer['name']} ({doc_id})")
+        else:
+            print(f"  ✗ Failed to add customer: {customer['name']}")
+    for deal, doc_id in zip(sample_deals, deals_future.result()):
         if doc_id:
-            print(f"  ✓ Added task: {task['title']}")
+            print(f"  ✓ Added deal: {deal['title']} ({doc_id})")
+        else:
+            print(f"  ✗ Failed to add deal: {deal['title']}")
+    for task, doc_id in zip(sample_tasks, tasks_future.result()):
+        if doc_id:
+            print(f"  ✓ Added task: {task['title']} ({doc_id})")
+        else:
+            print(f"  ✗ Failed to add task: {task['title']}")
     
     # Create demo user
     print("\n👤 Creating demo user account...")
@@ -186,13 +192,13 @@ def check_firebase_connection():
     if db:
         print("✅ Firebase is properly configured!")
         
-        # Test by getting collections
+        # Test with count aggregations, which transfer no documents
         try:
-            customers = FirebaseDB.get_records('customers')
-            deals = FirebaseDB.get_records('deals')
+            customer_count = FirebaseDB.count_records('customers')
+            deal_count = FirebaseDB.count_records('deals')
             print(f"\n📊 Current data:")
-            print(f"  • Customers: {len(customers)}")
-            print(f"  • Deals: {len(deals)}")
+            print(f"  • Customers: {customer_count}")
+            print(f"  • Deals: {deal_count}")
         except Exception as e:
             print(f"⚠️ Could not read data: {e}")
         
@@ -202,6 +208,30 @@ def check_firebase_connection():
         print("   Check your serviceAccountKey.json file")
         return False
 
+def backfill_lowercase_fields():
+    """Write the '<field>_lower' copies onto documents saved before they existed"""
+    print("\n🔤 Backfilling lower-cased search fields...")
+    
+    for collection, fields in FirebaseDB.LOWERCASE_FIELDS.items():
+        lower_fields = [f'{field}_lower' for field in fields]
+        updated = 0
+        pending = {}
+        
+        for record in FirebaseDB.stream_records(collection, fields=list(fields) + lower_fields):
+            stale = {field: record[field] for field in fields
+                     if record.get(field) is not None
+                     and record.get(f'{field}_lower') != str(record[field]).strip().lower()}
+            if stale:
+                # update_records_batch derives the '_lower' copies from these fields
+                pending[record['id']] = stale
+            if len(pending) == FirebaseDB.BATCH_LIMIT:
+                updated += FirebaseDB.update_records_batch(collection, pending)
+                pending = {}
+        if pending:
+            updated += FirebaseDB.update_records_batch(collection, pending)
+        
+        print(f"  ✓ {collection}: {updated} records updated")
+
 def clear_all_data():
     """Clear all Firebase data (use with caution!)"""
     response = input("\n⚠️ This will DELETE all data! Are you sure? (yes/no): ")
@@ -216,11 +246,9 @@ def clear_all_data():
     
     for collection in collections:
         try:
-            records = FirebaseDB.get_records(collection)
-            for record in records:
-                if 'id' in record:
-                    FirebaseDB.delete_record(collection, record['id'])
-            print(f"  ✓ Cleared {collection}: {len(records)} records")
+            # Deleted server-side in bulk; no document bodies are downloaded
+            deleted = FirebaseDB.delete_collection(collection)
+            print(f"  ✓ Cleared {collection}: {deleted} records")
         except Exception as e:
             print(f"  ⚠️ Could not clear {collection}: {e}")
 
@@ -230,10 +258,15 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Firebase CRM Setup')
     parser.add_argument('--clear', action='store_true', help='Clear all data')
     parser.add_argument('--check', action='store_true', help='Check connection only')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Add lower-cased search fields to existing records')
     args = parser.parse_args()
     
     if args.clear:
         clear_all_data()
+    elif args.backfill:
+        if check_firebase_connection():
+            backfill_lowercase_fields()
     elif args.check:
         check_firebase_connection()
     else:
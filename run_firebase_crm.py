@@ -8,9 +8,18 @@ import os
 import sys
 import subprocess
 from pathlib import Path
+from types import SimpleNamespace
 from decouple import config
 
-def check_env_setup():
+# Settings this script needs, read from the environment/.env once at import
+CFG = SimpleNamespace(
+    fb_path=config('FIREBASE_CREDENTIALS_PATH', default='core/serviceAccountKey.json'),
+    db_name=config('DATABASE_NAME', default='db_sessions_only.sqlite3'),
+    demo_email=config('DEMO_USER_EMAIL', default='admin@crm.com'),
+    demo_password=config('DEMO_USER_PASSWORD', default='admin123'),
+)
+
+def check_env_setup(firebase_path):
     """Check if .env file exists and is configured"""
     env_file = Path('.env')
     env_template = Path('.env.template')
@@ -35,8 +44,7 @@ def check_env_setup():
             return False
     
     # Check for Firebase credentials
-    firebase_path = config('FIREBASE_CREDENTIALS_PATH', default='core/serviceAccountKey.json')
-    if not os.path.exists(firebase_path):
+    if not Path(firebase_path).is_file():
         print(f"\n❌ Firebase credentials not found at: {firebase_path}")
         print("\n📝 Setup instructions:")
         print("1. Go to https://console.firebase.google.com")
@@ -54,39 +62,41 @@ def run_crm():
     print("=" * 50)
     
     # Check environment setup
-    if not check_env_setup():
+    if not check_env_setup(CFG.fb_path):
         return
     
     print("✅ Environment configured")
-    print(f"✅ Firebase credentials found at: {config('FIREBASE_CREDENTIALS_PATH')}")
+    print(f"✅ Firebase credentials found at: {CFG.fb_path}")
+    
+    # Load Django and Firebase once, in this process (importing the
+    # setup module runs django.setup())
+    import initialize_firebase
+    from django.core.management import call_command
     
     # Create session database if needed (minimal SQLite just for sessions)
-    db_name = config('DATABASE_NAME', default='db_sessions_only.sqlite3')
-    if not os.path.exists(db_name):
+    if not os.path.exists(CFG.db_name):
         print("\n📦 Setting up session storage...")
-        subprocess.run([sys.executable, 'manage.py', 'migrate', '--run-syncdb'])
+        call_command('migrate', run_syncdb=True)
         print("✅ Session storage ready")
     
     # Check if sample data exists
     print("\n🔍 Checking Firebase data...")
-    subprocess.run([sys.executable, 'initialize_firebase.py', '--check'])
+    initialize_firebase.check_firebase_connection()
     
     # Ask to initialize if needed
     response = input("\n💾 Initialize sample data? (y/n): ")
     if response.lower() == 'y':
-        subprocess.run([sys.executable, 'initialize_firebase.py'])
+        initialize_firebase.initialize_firebase()
     
     # Start the server
     print("\n🌐 Starting development server...")
     print("=" * 50)
     print("\n📍 Access your CRM at: http://127.0.0.1:8000")
     
-    # Get demo credentials from env
-    demo_email = config('DEMO_USER_EMAIL', default='admin@crm.com')
-    demo_password = config('DEMO_USER_PASSWORD', default='admin123')
-    print(f"👤 Login with: {demo_email} / {demo_password}")
+    print(f"👤 Login with: {CFG.demo_email} / {CFG.demo_password}")
     print("\n✨ Press CTRL+C to stop the server\n")
     
+    # The server keeps its own process so the autoreloader can restart it
     try:
         subprocess.run([sys.executable, 'manage.py', 'runserver'])
     except KeyboardInterrupt:
@@ -23,9 +23,27 @@ class DealSchema:
         'On Hold'
     ]
     
+    # Probability a stage move sets; stages not listed (On Hold) keep the deal's current value
+    STAGE_PROBABILITIES = {
+        'Lead': 10,
+        'Qualified': 25,
+        'Proposal': 50,
+        'Negotiation': 75,
+        'Won': 100,
+        'Lost': 0
+    }
+    
+    # Status a stage move sets; every other stage means the deal is Active
+    STAGE_STATUS = {
+        'Won': 'Won',
+        'Lost': 'Lost',
+        'On Hold': 'On Hold'
+    }
+    
     @staticmethod
     def create_deal_document(data: dict) -> dict:
         """Create a properly formatted deal document for Firebase"""
+        now = datetime.now().isoformat()
         return {
             'id': data.get('id', ''),
             'customer': str(data.get('customer', '')),
@@ -34,8 +52,8 @@ class DealSchema:
             'stage': data.get('stage', 'Lead'),
             'probability': int(data.get('probability', 0)),
             'expected_close': data.get('expected_close', ''),
-            'created_date': data.get('created_date', datetime.now().isoformat()),
-            'updated_date': datetime.now().isoformat(),
+            'created_date': data.get('created_date', now),
+            'updated_date': now,
             'assigned_to': str(data.get('assigned_to', '')),
             'status': data.get('status', 'Active'),
             'notes': str(data.get('notes', '')),
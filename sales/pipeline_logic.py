@@ -5,19 +5,13 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import json
 
+from .models import DealSchema
+
 class PipelineManager:
     """Manages sales pipeline operations and analytics"""
     
     # Stage conversion probabilities
-    STAGE_PROBABILITIES = {
-        'Lead': 10,
-        'Qualified': 25,
-        'Proposal': 50,
-        'Negotiation': 75,
-        'Won': 100,
-        'Lost': 0,
-        'On Hold': 0
-    }
+    STAGE_PROBABILITIES = DealSchema.STAGE_PROBABILITIES
     
     @staticmethod
     def get_pipeline_data(user=None, date_range=None):
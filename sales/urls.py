@@ -11,6 +11,7 @@ urlpatterns = [
     path('deals/<int:deal_id>/delete/', views.deal_delete, name='deal_delete'),
     path('deals/<int:deal_id>/activity/add/', views.activity_add, name='activity_add'),
     path('api/deal/<int:deal_id>/move/', views.deal_move_stage, name='deal_move_stage'),
+    path('api/deals/move/', views.deal_bulk_move_stage, name='deal_bulk_move_stage'),
     path('api/activity/<int:activity_id>/complete/', views.activity_complete, name='activity_complete'),
     path('api/pipeline/', views.pipeline_api, name='pipeline_api'),
     path('forecast/', views.sales_forecast, name='sales_forecast'),
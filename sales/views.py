@@ -11,6 +11,7 @@ from .models import DealSchema, PipelineHistorySchema, SalesActivitySchema, Sale
 from customers.models import CustomerSchema
 from core.decorators import role_required, log_activity
 from core.firebase_config import FirebaseDB
+from core.utils import bump_cache_version
 
 @login_required
 @log_activity('view_pipeline')
@@ -59,32 +60,35 @@ def pipeline_view(request):
 @log_activity('view_deals')
 def deal_list(request):
     """List all deals with filtering using Firebase"""
-    deals = FirebaseDB.get_records('deals')
+    # Owner, status and stage filters and the ordering are evaluated by Firestore
+    filters = []
     
     # Apply user filter
     if not request.user.is_staff:
-        user_email = request.user.email
-        deals = [d for d in deals if d.get('assigned_to') == user_email]
-    
-    # Search
-    search = request.GET.get('search', '')
-    if search:
-        deals = [d for d in deals if 
-                search.lower() in d.get('title', '').lower() or
-                search.lower() in d.get('customer', '').lower()]
+        filters.append(('assigned_to', '==', request.user.email))
     
     # Status filter
     status = request.GET.get('status', '')
     if status:
-        deals = [d for d in deals if d.get('status') == status]
+        filters.append(('status', '==', status))
     
     # Stage filter
     stage = request.GET.get('stage', '')
     if stage:
-        deals = [d for d in deals if d.get('stage') == stage]
+        filters.append(('stage', '==', stage))
     
-    # Sort by created_date (newest first)
-    deals.sort(key=lambda x: x.get('created_date', ''), reverse=True)
+    # Newest first, using the created_at index instead of a Python sort
+    # (created_at is set on every write path, unlike created_date)
+    deals = FirebaseDB.query_records('deals', filters,
+                                     order_by='created_at', descending=True)
+    
+    # Search
+    search = request.GET.get('search', '')
+    if search:
+        q = search.lower()
+        deals = [d for d in deals if 
+                q in d.get('title', '').lower() or
+                q in d.get('customer', '').lower()]
     
     # Simple pagination
     page = int(request.GET.get('page', 1))
@@ -190,6 +194,7 @@ def deal_create(request):
         doc_id = FirebaseDB.add_record('deals', deal_doc)
         
         if doc_id:
+            bump_cache_version('deals')
             # Create initial pipeline history
             history_data = {
                 'deal_id': doc_id,
@@ -271,6 +276,7 @@ def deal_update(request, deal_id):
         success = FirebaseDB.update_record('deals', deal_id, update_data)
         
         if success:
+            bump_cache_version('deals')
             # Check if stage changed
             if old_stage != update_data['stage']:
                 history_data = {
@@ -323,6 +329,7 @@ def deal_delete(request, deal_id):
         success = FirebaseDB.delete_record('deals', deal_id)
         
         if success:
+            bump_cache_version('deals')
             deal_title = deal.get('title', 'Unknown')
             messages.success(request, f"✅ Deal '{deal_title}' deleted successfully!")
             return redirect('deal_list')
@@ -334,6 +341,26 @@ def deal_delete(request, deal_id):
         'active_tab': 'deals'
     })
 
+def _stage_move_update(deal, new_stage):
+    """Fields to write when a deal moves to new_stage"""
+    return {
+        'stage': new_stage,
+        'updated_date': datetime.now().isoformat(),
+        # On Hold is not in the table and keeps the current probability
+        'probability': DealSchema.STAGE_PROBABILITIES.get(new_stage, deal.get('probability', 0)),
+        'status': DealSchema.STAGE_STATUS.get(new_stage, 'Active')
+    }
+
+def _stage_move_history(deal_id, old_stage, new_stage, user, notes):
+    """Pipeline history document recording a stage move"""
+    return PipelineHistorySchema.create_history_document({
+        'deal_id': deal_id,
+        'from_stage': old_stage,
+        'to_stage': new_stage,
+        'changed_by': user.email,
+        'notes': notes
+    })
+
 @login_required
 @require_http_methods(["POST"])
 def deal_move_stage(request, deal_id):
@@ -363,45 +390,14 @@ def deal_move_stage(request, deal_id):
     
     # Update deal stage
     old_stage = deal.get('stage')
-    update_data = {
-        'stage': new_stage,
-        'updated_date': datetime.now().isoformat()
-    }
-    
-    # Update probability based on stage
-    stage_probabilities = {
-        'Lead': 10,
-        'Qualified': 25,
-        'Proposal': 50,
-        'Negotiation': 75,
-        'Won': 100,
-        'Lost': 0,
-        'On Hold': deal.get('probability', 0)
-    }
-    update_data['probability'] = stage_probabilities.get(new_stage, deal.get('probability', 0))
-    
-    # Update status based on stage
-    if new_stage == 'Won':
-        update_data['status'] = 'Won'
-    elif new_stage == 'Lost':
-        update_data['status'] = 'Lost'
-    elif new_stage == 'On Hold':
-        update_data['status'] = 'On Hold'
-    else:
-        update_data['status'] = 'Active'
+    update_data = _stage_move_update(deal, new_stage)
     
     success = FirebaseDB.update_record('deals', deal_id, update_data)
     
     if success:
+        bump_cache_version('deals')
         # Create history record
-        history_data = {
-            'deal_id': deal_id,
-            'from_stage': old_stage,
-            'to_stage': new_stage,
-            'changed_by': request.user.email,
-            'notes': notes
-        }
-        history_doc = PipelineHistorySchema.create_history_document(history_data)
+        history_doc = _stage_move_history(deal_id, old_stage, new_stage, request.user, notes)
         FirebaseDB.add_record('pipeline_history', history_doc)
         
         return JsonResponse({
@@ -414,6 +410,56 @@ def deal_move_stage(request, deal_id):
     
     return JsonResponse({'error': 'Failed to update deal'}, status=500)
 
+@login_required
+@require_http_methods(["POST"])
+def deal_bulk_move_stage(request):
+    """API endpoint to move several deals to one stage with batched Firebase writes"""
+    data = json.loads(request.body)
+    # Drop duplicates but keep the order the client sent
+    deal_ids = list(dict.fromkeys(str(deal_id) for deal_id in data.get('deal_ids', [])))
+    new_stage = data.get('stage')
+    notes = data.get('notes', '')
+    
+    if not deal_ids:
+        return JsonResponse({'error': 'Deal IDs are required'}, status=400)
+    if not new_stage:
+        return JsonResponse({'error': 'Stage is required'}, status=400)
+    # One batch commits atomically, so the deals either all move or none do
+    if len(deal_ids) > FirebaseDB.BATCH_LIMIT:
+        return JsonResponse({'error': f'At most {FirebaseDB.BATCH_LIMIT} deals can be moved at once'}, status=400)
+    
+    deals = FirebaseDB.get_records_by_ids('deals', deal_ids, fields=['stage', 'probability', 'assigned_to'])
+    found = {deal['id'] for deal in deals}
+    missing = [deal_id for deal_id in deal_ids if deal_id not in found]
+    if missing:
+        return JsonResponse({'error': 'Deal not found', 'deal_ids': missing}, status=404)
+    
+    # Check permissions on every deal before writing any of them
+    if not request.user.is_staff and any(deal.get('assigned_to') != request.user.email for deal in deals):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    updates = {deal['id']: _stage_move_update(deal, new_stage) for deal in deals}
+    moved = [{
+        'deal_id': deal_id,
+        'status': update['status'],
+        'probability': update['probability']
+    } for deal_id, update in updates.items()]
+    
+    if not FirebaseDB.update_records_batch('deals', updates):
+        return JsonResponse({'error': 'Failed to update deals'}, status=500)
+    
+    bump_cache_version('deals')
+    FirebaseDB.add_records_batch('pipeline_history', [
+        _stage_move_history(deal['id'], deal.get('stage'), new_stage, request.user, notes)
+        for deal in deals
+    ])
+    
+    return JsonResponse({
+        'success': True,
+        'new_stage': new_stage,
+        'deals': moved
+    })
+
 @login_required
 def activity_add(request, deal_id):
     """Add activity to a deal using Firebase"""
@@ -505,8 +551,8 @@ def sales_forecast(request):
     """Sales forecasting view using Firebase"""
     period_type = request.GET.get('type', 'monthly')
     
-    # Get deals from Firebase
-    deals = FirebaseDB.get_records('deals')
+    # Get deals from Firebase, projected to the fields the forecast reads
+    deals = FirebaseDB.get_records('deals', fields=['value', 'probability', 'expected_close'])
     
     # Generate forecasts for next 6 periods
     forecasts = []